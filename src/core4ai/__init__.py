@@ -10,10 +10,26 @@ __version__ = "1.3.1"
 
 from .cli.commands import cli
 from .config.config import load_config, save_config, get_mlflow_uri, get_provider_config
-from .providers import AIProvider
-from .engine.processor import process_query, list_prompts
-from .api import Core4AI
-from .config.config_manager import Config
+
+# The remaining public names pull in MLflow/LangGraph, so they are resolved
+# on first access instead of at `import core4ai` time.
+_LAZY_ATTRS = {
+    "AIProvider": ".providers",
+    "process_query": ".engine.processor",
+    "list_prompts": ".engine.processor",
+    "Core4AI": ".api",
+    "Config": ".config.config_manager",
+}
+
+def __getattr__(name):
+    """Import heavy public attributes on first access."""
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
 
 __all__ = [
     "cli", 
@@ -5,23 +5,42 @@ import json
 import os
 import sys
 import logging
-import asyncio
-from pathlib import Path
-from typing import Dict, Any, Optional
 
 # Internal imports
-from ..config.config import load_config, get_mlflow_uri, get_provider_config
-from ..prompt_manager.registry import (
-    register_prompt, register_from_file, register_from_markdown, list_prompts as registry_list_prompts,
-    register_sample_prompts, update_prompt, get_prompt_details, create_prompt_template
-)
-from ..engine.processor import process_query
-from ..providers.utilities import verify_ollama_running, get_ollama_models
-from .setup import setup_wizard
+# Heavy modules (MLflow registry, LangGraph engine, the setup wizard's HTTP
+# and provider dependencies) are imported inside the commands that need them
+# so that `core4ai version`, `core4ai --help`, etc. don't pay their import cost.
 
 # Set up logging
 logger = logging.getLogger("core4ai.cli")
 
+def _lazy_config():
+    """Return the config module, imported on first use."""
+    from ..config import config
+    return config
+
+# Event loop that `core4ai shell` runs every command on. AIProvider.create
+# only reuses a cached provider on the loop it was built on, so sharing one
+# loop is what lets later shell commands reuse earlier commands' providers.
+_shell_loop = None
+
+def _run_async(coro):
+    """Run a coroutine to completion, on the shell's loop inside `core4ai shell`."""
+    import asyncio
+    
+    if _shell_loop is not None:
+        return _shell_loop.run_until_complete(coro)
+    return asyncio.run(coro)
+
+def _must_exist(path: str) -> str:
+    """Exit with a friendly error unless the file exists (single stat call)."""
+    try:
+        os.stat(path)
+    except FileNotFoundError:
+        click.echo(f"❌ Error: File '{path}' not found.")
+        sys.exit(1)
+    return path
+
 @click.group()
 @click.option('--verbose', '-v', is_flag=True, help='Enable verbose logging')
 def cli(verbose):
@@ -42,6 +61,7 @@ def setup():
     
     This wizard helps you configure Core4AI with MLflow and your preferred AI provider.
     """
+    from .setup import setup_wizard
     setup_wizard()
     
 # Add these commands to the CLI in src/core4ai/cli/commands.py
@@ -351,8 +371,13 @@ def register(prompt, file, markdown, name, dir, samples, only_new, no_production
     # Create and edit a new prompt template first
     core4ai register --create email
     """
+    from ..prompt_manager.registry import (
+        register_prompt, register_from_file, register_from_markdown,
+        register_sample_prompts, create_prompt_template
+    )
+    
     # MLflow connection check
-    mlflow_uri = get_mlflow_uri()
+    mlflow_uri = _lazy_config().get_mlflow_uri()
     if not mlflow_uri:
         click.echo("❌ Error: MLflow URI not configured. Run 'core4ai setup' first.")
         sys.exit(1)
@@ -365,10 +390,9 @@ def register(prompt, file, markdown, name, dir, samples, only_new, no_production
             prompt_name = click.prompt("Enter a name for the new prompt (e.g., email, blog, analysis)")
             
         # Create the template
-        output_dir = dir if dir else None
         result = create_prompt_template(
             prompt_name=prompt_name,
-            output_dir=Path(output_dir) if output_dir else None
+            output_dir=dir
         )
         
         if result["status"] == "success":
@@ -458,9 +482,7 @@ def register(prompt, file, markdown, name, dir, samples, only_new, no_production
     
     # Option: Register from markdown file
     if markdown:
-        if not Path(markdown).exists():
-            click.echo(f"❌ Error: File '{markdown}' not found.")
-            sys.exit(1)
+        _must_exist(markdown)
         
         click.echo(f"Registering prompt from markdown file: {markdown}")
         result = register_from_markdown(markdown, set_as_production=not no_production)
@@ -474,9 +496,7 @@ def register(prompt, file, markdown, name, dir, samples, only_new, no_production
     
     # Option: Register from JSON file
     if file:
-        if not Path(file).exists():
-            click.echo(f"❌ Error: File '{file}' not found.")
-            sys.exit(1)
+        _must_exist(file)
         
         click.echo(f"Registering prompts from JSON file: {file}")
         result = register_from_file(file, set_as_production=not no_production)
@@ -500,9 +520,8 @@ def register(prompt, file, markdown, name, dir, samples, only_new, no_production
                     name = f"{name}_prompt"
         
         # Extract type from name
-        if "_" in name:
-            prompt_type = name.split("_")[0]
-            
+        prompt_type = name.split("_", 1)[0] if "_" in name else None
+        if prompt_type:
             # Add to prompt type registry
             from ..prompt_manager.prompt_types import add_prompt_type
             add_prompt_type(prompt_type)
@@ -512,7 +531,7 @@ def register(prompt, file, markdown, name, dir, samples, only_new, no_production
             name=name,
             template=prompt,
             commit_message="Registered via CLI",
-            tags={"type": name.split("_")[0]} if "_" in name else {},
+            tags={"type": prompt_type} if prompt_type else {},
             set_as_production=not no_production
         )
         
@@ -531,7 +550,8 @@ def register(prompt, file, markdown, name, dir, samples, only_new, no_production
 @cli.command()
 @click.option('--details', '-d', is_flag=True, help='Show detailed information')
 @click.option('--name', '-n', help='Get details for a specific prompt')
-def list(details, name):
+@click.option('--ndjson', is_flag=True, help='Output one JSON object per prompt per line')
+def list(details, name, ndjson):
     """List available prompts.
     
     Examples:
@@ -547,9 +567,19 @@ def list(details, name):
     \b
     # Get details for a specific prompt
     core4ai list --name essay_prompt
+    
+    \b
+    # Stream prompts as newline-delimited JSON
+    core4ai list --ndjson | jq .name
+    
+    \b
+    # One prompt's details as a single JSON line
+    core4ai list --name essay_prompt --ndjson
     """
+    from ..prompt_manager.registry import list_prompts as registry_list_prompts, get_prompt_details
+    
     # Check for MLflow URI
-    mlflow_uri = get_mlflow_uri()
+    mlflow_uri = _lazy_config().get_mlflow_uri()
     if not mlflow_uri:
         click.echo("❌ Error: MLflow URI not configured. Run 'core4ai setup' first.")
         sys.exit(1)
@@ -557,26 +587,36 @@ def list(details, name):
     if name:
         # Get details for a specific prompt
         result = get_prompt_details(name)
-        if result.get("status") == "success":
-            click.echo(f"Prompt: {result['name']}")
-            click.echo(f"Latest Version: {result['latest_version']}")
+        if result.get("status") == "success" and ndjson:
+            # The prompt's details as a single JSON line
+            details_obj = {key: value for key, value in result.items() if key != "status"}
+            click.echo(json.dumps(details_obj))
+        elif result.get("status") == "success":
+            lines = [
+                f"Prompt: {result['name']}",
+                f"Latest Version: {result['latest_version']}"
+            ]
             
             if result.get('production_version'):
-                click.echo(f"Production Version: {result['production_version']}")
+                lines.append(f"Production Version: {result['production_version']}")
             
             if result.get('archived_versions'):
-                click.echo(f"Archived Versions: {', '.join(map(str, result['archived_versions']))}")
+                lines.append(f"Archived Versions: {', '.join(map(str, result['archived_versions']))}")
             
-            click.echo(f"Variables: {', '.join(result['variables'])}")
+            lines.append(f"Variables: {', '.join(result['variables'])}")
             
             if result.get('tags'):
-                click.echo(f"Tags: {json.dumps(result['tags'])}")
+                lines.append(f"Tags: {json.dumps(result['tags'], separators=(',', ':'))}")
             
             if details:
-                click.echo("\nTemplate:")
-                click.echo("------------------------------")
-                click.echo(result['latest_template'])
-                click.echo("------------------------------")
+                lines.extend([
+                    "\nTemplate:",
+                    "------------------------------",
+                    result['latest_template'],
+                    "------------------------------"
+                ])
+            
+            click.echo("\n".join(lines))
         else:
             click.echo(f"❌ Error: {result.get('error', 'Unknown error')}")
     else:
@@ -585,35 +625,36 @@ def list(details, name):
         if result.get("status") == "success":
             prompts = result.get("prompts", [])
             if prompts:
-                if details:
+                if ndjson:
+                    # One JSON object per line, so consumers can stream it
+                    click.echo("\n".join(json.dumps(prompt) for prompt in prompts))
+                elif details:
                     # Detailed output as JSON
                     click.echo(json.dumps(prompts, indent=2))
                 else:
                     # Simple table output
-                    click.echo(f"Found {len(prompts)} prompts:")
-                    
                     # Headers
                     headers = ["Name", "Type", "Variables", "Version"]
                     
-                    # Format and print
-                    row_format = "{:<25} {:<15} {:<30} {:<10}"
+                    # Format all rows, then print the table in a single echo
+                    row_format = "{:<25} {:<15} {:<30} {:<10}".format
                     
-                    click.echo(row_format.format(*headers))
-                    click.echo("-" * 80)
+                    lines = [f"Found {len(prompts)} prompts:", row_format(*headers), "-" * 80]
                     
                     for prompt in prompts:
-                        vars_str = ", ".join(prompt.get("variables", [])[:3])
-                        if len(prompt.get("variables", [])) > 3:
+                        variables = prompt.get("variables", [])
+                        vars_str = ", ".join(variables[:3])
+                        if len(variables) > 3:
                             vars_str += "..."
                         
-                        row = [
+                        lines.append(row_format(
                             prompt["name"], 
                             prompt["type"], 
                             vars_str, 
                             str(prompt.get("latest_version", "N/A"))
-                        ]
-                        
-                        click.echo(row_format.format(*row))
+                        ))
+                    
+                    click.echo("\n".join(lines))
             else:
                 click.echo("No prompts found. Use 'core4ai register --samples' to register sample prompts.")
         else:
@@ -735,6 +776,7 @@ def chat(query, verbose, simple):
     """
     import time  # Add the time import
     import logging
+    from ..engine.processor import process_query
 
     # Always save the current logging level regardless of mode
     original_level = logging.getLogger().level
@@ -744,13 +786,14 @@ def chat(query, verbose, simple):
         # Set logging to error level only to suppress info logging
         logging.getLogger().setLevel(logging.ERROR)
 
-    mlflow_uri = get_mlflow_uri()
+    config = _lazy_config()
+    mlflow_uri = config.get_mlflow_uri()
     if not mlflow_uri:
         click.echo("❌ Error: MLflow URI not configured. Run 'core4ai setup' first.")
         sys.exit(1)
     
     # Get provider config
-    provider_config = get_provider_config()
+    provider_config = config.get_provider_config()
     if not provider_config or not provider_config.get('type'):
         click.echo("❌ Error: AI provider not configured. Run 'core4ai setup' first.")
         sys.exit(1)
@@ -769,7 +812,7 @@ def chat(query, verbose, simple):
         
         try:
             # Process the query
-            result = asyncio.run(process_query(query, provider_config, verbose and not simple))
+            result = _run_async(process_query(query, provider_config, verbose and not simple))
             
             # Display results
             if simple:
@@ -786,10 +829,11 @@ def chat(query, verbose, simple):
                 click.echo(f"Original Query: {query}")
                 
                 if match_status == "matched":
+                    reasoning = prompt_match.get('reasoning')
                     click.echo(f"\nMatched to: {prompt_match.get('prompt_name')}")
                     click.echo(f"Confidence: {prompt_match.get('confidence')}%")
-                    if verbose and prompt_match.get('reasoning'):
-                        click.echo(f"Reasoning: {prompt_match.get('reasoning')}")
+                    if verbose and reasoning:
+                        click.echo(f"Reasoning: {reasoning}")
                 elif match_status == "no_match":
                     click.echo("\nNo matching prompt template found.")
                 elif match_status == "no_prompts_available":
@@ -869,7 +913,7 @@ def chat(query, verbose, simple):
                             bar.update(1)
                         
                         # Process query
-                        result = asyncio.run(process_query(user_query, provider_config, True))
+                        result = _run_async(process_query(user_query, provider_config, True))
                 else:
                     # In simple mode, just show a minimal indicator or spinner
                     with click.progressbar(length=100, label='Thinking...', show_eta=False) as bar:
@@ -878,7 +922,7 @@ def chat(query, verbose, simple):
                             bar.update(1)
                         
                         # Process query
-                        result = asyncio.run(process_query(user_query, provider_config, False))
+                        result = _run_async(process_query(user_query, provider_config, False))
                 
                 # Display results with emoji but level of detail based on verbose flag
                 click.echo("\n🤖 ", nl=False)  # Always keep the robot emoji
@@ -915,6 +959,145 @@ def chat(query, verbose, simple):
         if not verbose:
             logging.getLogger().setLevel(interactive_log_level)
 
+@cli.command(name="chat-batch")
+@click.argument('input_file', type=click.File('r'), default='-')
+@click.option('--batch-size', default=16, show_default=True, type=click.IntRange(min=1),
+              help='Maximum number of queries processed concurrently')
+@click.option('--simple', '-s', is_flag=True, help='Show only the responses')
+@click.option('--verbose', '-v', is_flag=True, help='Show verbose output')
+def chat_batch(input_file, batch_size, simple, verbose):
+    """Process many queries in one run, one query per line.
+    
+    Queries are read from INPUT_FILE (or stdin) and sent concurrently, so the
+    provider round-trips overlap instead of running back to back. Results are
+    printed in input order.
+    
+    Examples:
+    
+    \b
+    # Process queries from a file
+    core4ai chat-batch queries.txt
+    
+    \b
+    # Pipe queries through stdin, showing only the responses
+    cat queries.txt | core4ai chat-batch --simple
+    """
+    from ..engine.processor import process_queries
+
+    config = _lazy_config()
+    if not config.get_mlflow_uri():
+        click.echo("❌ Error: MLflow URI not configured. Run 'core4ai setup' first.")
+        sys.exit(1)
+    
+    provider_config = config.get_provider_config()
+    if not provider_config or not provider_config.get('type'):
+        click.echo("❌ Error: AI provider not configured. Run 'core4ai setup' first.")
+        sys.exit(1)
+    
+    queries = [line.strip() for line in input_file if line.strip()]
+    if not queries:
+        click.echo("No queries provided.")
+        return
+    
+    original_level = logging.getLogger().level
+    if not verbose:
+        logging.getLogger().setLevel(logging.ERROR)
+    try:
+        results = _run_async(process_queries(queries, provider_config, verbose, batch_size=batch_size))
+    finally:
+        logging.getLogger().setLevel(original_level)
+    
+    for i, (query, result) in enumerate(zip(queries, results), 1):
+        if simple:
+            click.echo(result.get('response', 'No response received.'))
+            continue
+        
+        prompt_match = result.get("prompt_match", {})
+        click.echo(f"\n=== Query {i}/{len(queries)} ===\n")
+        click.echo(f"Original Query: {query}")
+        if prompt_match.get("status") == "matched":
+            click.echo(f"Matched to: {prompt_match.get('prompt_name')} ({prompt_match.get('confidence')}%)")
+        if result.get("enhanced", False) and result.get("enhanced_query"):
+            click.echo(f"Enhanced Query: {result['enhanced_query']}")
+        click.echo("\nResponse:")
+        click.echo(result.get('response', 'No response received.'))
+
+def invoke(argv):
+    """Run a CLI command in-process without going through the console script.
+    
+    Args:
+        argv: Command line arguments, e.g. ``["chat", "--simple", "hi"]``
+        
+    Returns:
+        The return value of the invoked command
+    """
+    return cli.main(args=argv, prog_name="core4ai", standalone_mode=False)
+
+@cli.command()
+def shell():
+    """Start an interactive shell that runs Core4AI commands in one process.
+    
+    Modules, configuration and cached providers stay loaded between
+    commands, so only the first command pays the start-up cost. Every
+    command runs on one event loop, which providers are cached against.
+    
+    Examples:
+    
+    \b
+    # Start the shell, then type commands without the 'core4ai' prefix
+    core4ai shell
+    """
+    import asyncio
+    global _shell_loop
+    
+    click.echo("Core4AI shell. Type 'help' for commands, 'exit' to quit.")
+    
+    _shell_loop = asyncio.new_event_loop()
+    try:
+        _shell_repl()
+    finally:
+        loop, _shell_loop = _shell_loop, None
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
+
+def _shell_repl():
+    """Read and run shell commands until the user exits."""
+    import shlex
+    
+    while True:
+        try:
+            line = click.prompt("core4ai", prompt_suffix="> ", default="", show_default=False)
+        except click.exceptions.Abort:
+            click.echo()
+            break
+        
+        line = line.strip()
+        if not line:
+            continue
+        if line in ('exit', 'quit', '/bye'):
+            break
+        
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            click.echo(f"❌ Error: {e}")
+            continue
+        
+        if argv == ['help']:
+            argv = ['--help']
+        if argv and argv[0] == 'shell':
+            click.echo("Already in the Core4AI shell.")
+            continue
+        
+        try:
+            invoke(argv)
+        except click.exceptions.ClickException as e:
+            e.show()
+        except (click.exceptions.Abort, click.exceptions.Exit, SystemExit):
+            pass
+
 @cli.command()
 def version():
     """Show Core4AI version information.
@@ -930,7 +1113,7 @@ def version():
     click.echo(f"Core4AI version: {__version__}")
     
     # Show configuration
-    config = load_config()
+    config = _lazy_config().load_config()
     mlflow_uri = config.get('mlflow_uri', 'Not configured')
     provider = config.get('provider', {}).get('type', 'Not configured')
     model = config.get('provider', {}).get('model', 'default')
@@ -945,12 +1128,14 @@ def version():
     if prompt_types:
         click.echo(f"Registered prompt types: {len(prompt_types)}")
     
-    # Show system information
-    import platform
-    import sys
-    
-    click.echo(f"Python version: {platform.python_version()}")
-    click.echo(f"System: {platform.system()} {platform.release()}")
+    # Show system information (os.uname avoids importing platform on POSIX)
+    click.echo(f"Python version: {sys.version.split()[0]}")
+    if hasattr(os, 'uname'):
+        uname = os.uname()
+        click.echo(f"System: {uname.sysname} {uname.release}")
+    else:
+        import platform
+        click.echo(f"System: {platform.system()} {platform.release()}")
 
 if __name__ == "__main__":
     cli()
\ No newline at end of file
@@ -1,4 +1,6 @@
 import os
+import copy
+import functools
 import yaml
 from pathlib import Path
 from typing import Optional
@@ -6,6 +8,12 @@ import logging
 
 logger = logging.getLogger("core4ai.config")
 
+# Use the LibYAML C bindings when PyYAML was built with them
+try:
+    from yaml import CSafeLoader as _SafeLoader, CSafeDumper as _SafeDumper
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader, SafeDumper as _SafeDumper
+
 CONFIG_DIR = Path.home() / ".core4ai"
 CONFIG_FILE = CONFIG_DIR / "config.yaml"
 
@@ -15,31 +23,53 @@ def ensure_config_dir():
         CONFIG_DIR.mkdir(parents=True)
         logger.info(f"Created configuration directory at {CONFIG_DIR}")
 
-def load_config():
-    """Load configuration from file."""
-    if not CONFIG_FILE.exists():
-        logger.info(f"No configuration file found at {CONFIG_FILE}")
-        return {}
-
+@functools.lru_cache(maxsize=1)
+def _read_config_file(config_file, mtime_ns, size):
+    """Read and parse the configuration file.
+    
+    Cached on the file's path, modification time and size, so the file is
+    only parsed again after it changes on disk.
+    """
     try:
-        with open(CONFIG_FILE, 'r') as f:
-            config = yaml.safe_load(f) or {}
+        with open(config_file, 'r') as f:
+            config = yaml.load(f, Loader=_SafeLoader) or {}
             logger.debug(f"Loaded configuration: {config}")
             return config
     except Exception as e:
         logger.error(f"Error loading configuration: {e}")
         return {}
 
+def clear_config_cache():
+    """Drop the cached configuration so the next load re-reads the file."""
+    _read_config_file.cache_clear()
+
+def load_config():
+    """Load configuration from file.
+    
+    The file is only parsed when it has changed since the last load; callers
+    get their own copy so they can modify it freely before passing it to
+    save_config.
+    """
+    try:
+        stat = os.stat(CONFIG_FILE)
+    except OSError:
+        logger.info(f"No configuration file found at {CONFIG_FILE}")
+        return {}
+    
+    return copy.deepcopy(_read_config_file(CONFIG_FILE, stat.st_mtime_ns, stat.st_size))
+
 def save_config(config):
     """Save configuration to file."""
     ensure_config_dir()
     
     try:
         with open(CONFIG_FILE, 'w') as f:
-            yaml.dump(config, f)
+            yaml.dump(config, f, Dumper=_SafeDumper)
         logger.info(f"Configuration saved to {CONFIG_FILE}")
     except Exception as e:
         logger.error(f"Error saving configuration: {e}")
+    finally:
+        clear_config_cache()
 
 def get_mlflow_uri():
     """Get the MLflow URI from config or environment."""
@@ -1,7 +1,6 @@
 """
 Configuration manager for Core4AI.
 """
-from pathlib import Path
 from typing import Optional, Dict, Any, List
 from .config import save_config, load_config, ensure_config_dir
 
@@ -136,7 +135,7 @@ class Config:
             Dictionary with creation results
         """
         from ..prompt_manager.registry import create_prompt_template
-        return create_prompt_template(prompt_name, Path(output_dir) if output_dir else None)
+        return create_prompt_template(prompt_name, output_dir)
     
     def register_prompt(self, name: str, template: str, commit_message: str = "Via Python API", 
                        tags: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
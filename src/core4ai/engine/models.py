@@ -15,8 +15,9 @@ class PromptMatch(BaseModel):
         # If value is a decimal between 0-1 (exclusive), convert to percentage
         if 0 < v < 1:
             return v * 100
-        # If value is already in percentage range, keep it
-        elif 1 <= v <= 100:
+        # If value is already in percentage range, keep it; 0 is what the
+        # match prompts ask for when no template fits ("none")
+        elif v == 0 or 1 <= v <= 100:
             return v
         # Otherwise, it's invalid
         else:
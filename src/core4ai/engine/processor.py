@@ -2,7 +2,7 @@
 Query processor that leverages the workflow engine for prompt enhancement.
 """
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 logger = logging.getLogger("core4ai.engine.processor")
 
@@ -198,6 +198,39 @@ async def process_query(query: str, provider_config: Optional[Dict[str, Any]] =
         
         return error_response
 
+async def process_queries(queries: List[str], provider_config: Optional[Dict[str, Any]] = None,
+                          verbose: bool = False, record_analytics: bool = True,
+                          batch_size: int = 16) -> List[Dict[str, Any]]:
+    """
+    Process several queries concurrently through the Core4AI workflow.
+    
+    Up to ``batch_size`` queries are in flight at once, so the provider
+    round-trips overlap instead of running one after another.
+    
+    Args:
+        queries: The queries to process
+        provider_config: Optional provider configuration
+        verbose: Whether to show verbose output
+        record_analytics: Whether to record analytics data
+        batch_size: Maximum number of queries processed concurrently
+        
+    Returns:
+        List of result dicts, in the same order as ``queries``
+    """
+    import asyncio
+    
+    if not provider_config:
+        from ..config.config import get_provider_config
+        provider_config = get_provider_config()
+    
+    semaphore = asyncio.Semaphore(max(1, batch_size))
+    
+    async def run_one(query: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await process_query(query, provider_config, verbose, record_analytics)
+    
+    return await asyncio.gather(*(run_one(query) for query in queries))
+
 def list_prompts() -> Dict[str, Any]:
     """
     List all available prompts.
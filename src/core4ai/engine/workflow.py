@@ -5,16 +5,72 @@ import logging
 import json
 import re
 import asyncio
+import functools
 from typing import Dict, Any, TypedDict, List, Optional, Tuple
 
-# Import LangGraph components
-from langgraph.graph import StateGraph, END, START
-from langchain_core.messages import HumanMessage
 from ..providers import AIProvider
 
 # Set up logging
 logger = logging.getLogger("core4ai.engine.workflow")
 
+# Parse provider JSON with orjson when it is installed; both accept bytes or str
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+# Matches {{ variable }} placeholders in prompt templates
+_VAR_RE = re.compile(r'{{([^{}]+)}}')
+
+@functools.lru_cache(maxsize=256)
+def _template_vars(template: str) -> Tuple[str, ...]:
+    """Get the variable names used in a template, in order of appearance."""
+    return tuple(match.group(1).strip() for match in _VAR_RE.finditer(template))
+
+# Keywords suggesting each prompt type, used when LLM matching fails
+_KEYWORD_MAP = {
+    "essay": ["essay", "write about", "discuss", "research", "analyze", "academic"],
+    "email": ["email", "message", "write to", "contact", "reach out"],
+    "technical": ["explain", "how does", "technical", "guide", "tutorial", "concept"],
+    "creative": ["story", "creative", "poem", "fiction", "narrative", "imaginative"],
+    "code": ["code", "program", "script", "function", "algorithm", "programming", "implement"],
+    "summary": ["summarize", "summary", "brief", "condense", "overview", "recap"],
+    "analysis": ["analyze", "analysis", "critique", "evaluate", "assess", "examine"],
+    "qa": ["question", "answer", "qa", "respond to", "reply to", "doubt"],
+    "social_media": ["post", "tweet", "social media", "instagram", "facebook", "linkedin"],
+    "report": ["report", "business report", "analysis report", "status", "findings"],
+    "comparison": ["compare", "comparison", "versus", "vs", "differences", "similarities"],
+    "research": ["research", "investigate", "study", "literature", "academic"],
+    "interview": ["interview", "job", "hiring", "position", "application"],
+    "sales_copy": ["sales", "copy", "product", "persuasive", "marketing"],
+    "api_documentation": ["api", "documentation", "endpoint", "interface", "reference"],
+    "syllabus": ["syllabus", "course", "lesson", "curriculum", "learning"]
+}
+
+def _keyword_match(query: str, available_prompts: Dict[str, Any]) -> Optional[str]:
+    """Pick the available prompt whose type keywords appear most often in the query.
+    
+    Args:
+        query: The user query
+        available_prompts: Available prompts keyed by name
+        
+    Returns:
+        The best matching prompt name, or None if no keywords match
+    """
+    query_lower = query.lower()
+    keyword_matches = {}
+    for prompt_type, keywords in _KEYWORD_MAP.items():
+        prompt_name = f"{prompt_type}_prompt"
+        if prompt_name in available_prompts:
+            hits = sum(keyword in query_lower for keyword in keywords)
+            if hits:
+                keyword_matches[prompt_name] = hits
+    
+    # Find the prompt with the most keyword matches
+    if not keyword_matches:
+        return None
+    return max(keyword_matches.items(), key=lambda x: x[1])[0]
+
 # Define state schema for type safety
 class QueryState(TypedDict, total=False):
     user_query: str
@@ -52,11 +108,7 @@ async def match_prompt(state: QueryState) -> QueryState:
     prompt_details = {}
     for name, prompt_obj in available_prompts.items():
         # Extract variables from the template
-        variables = []
-        template = prompt_obj.template
-        for match in re.finditer(r'{{([^{}]+)}}', template):
-            var_name = match.group(1).strip()
-            variables.append(var_name)
+        variables = list(_template_vars(prompt_obj.template))
         
         # Get description from metadata or tags if available
         description = ""
@@ -236,7 +288,7 @@ async def match_prompt(state: QueryState) -> QueryState:
                             if json_match:
                                 json_str = json_match.group(1)
                                 # Try to parse the JSON
-                                json_data = json.loads(json_str)
+                                json_data = _json_loads(json_str)
                                 
                                 # Validate the parsed data has required fields
                                 if all(k in json_data for k in ["prompt_name", "confidence", "reasoning", "parameters"]):
@@ -357,7 +409,7 @@ async def match_prompt(state: QueryState) -> QueryState:
                 if raw_response:
                     try:
                         # Try to parse the whole response as JSON
-                        json_data = json.loads(raw_response)
+                        json_data = _json_loads(raw_response)
                         logger.debug(f"Successfully parsed raw response as JSON:\n{json.dumps(json_data, indent=2)}")
                     except json.JSONDecodeError:
                         # If that fails, try to extract a JSON object using regex
@@ -365,7 +417,7 @@ async def match_prompt(state: QueryState) -> QueryState:
                         if json_match:
                             json_str = json_match.group(1)
                             try:
-                                json_data = json.loads(json_str)
+                                json_data = _json_loads(json_str)
                                 logger.debug(f"Extracted JSON from raw response:\n{json.dumps(json_data, indent=2)}")
                             except:
                                 logger.debug(f"Found JSON-like string but couldn't parse it:\n{json_str}")
@@ -376,7 +428,7 @@ async def match_prompt(state: QueryState) -> QueryState:
                     if json_match:
                         json_str = json_match.group(1)
                         try:
-                            json_data = json.loads(json_str)
+                            json_data = _json_loads(json_str)
                             logger.debug(f"Extracted JSON from error:\n{json.dumps(json_data, indent=2)}")
                         except:
                             logger.debug(f"Found JSON-like string in error but couldn't parse it:\n{json_str}")
@@ -391,39 +443,10 @@ async def match_prompt(state: QueryState) -> QueryState:
     logger.warning("All structured match attempts failed. Falling back to keyword matching.")
     
     # Simple fallback to keyword matching
-    keyword_matches = {}
-    query_lower = query.lower()
-    
-    keyword_map = {
-        "essay": ["essay", "write about", "discuss", "research", "analyze", "academic"],
-        "email": ["email", "message", "write to", "contact", "reach out"],
-        "technical": ["explain", "how does", "technical", "guide", "tutorial", "concept"],
-        "creative": ["story", "creative", "poem", "fiction", "narrative", "imaginative"],
-        "code": ["code", "program", "script", "function", "algorithm", "programming", "implement"],
-        "summary": ["summarize", "summary", "brief", "condense", "overview", "recap"],
-        "analysis": ["analyze", "analysis", "critique", "evaluate", "assess", "examine"],
-        "qa": ["question", "answer", "qa", "respond to", "reply to", "doubt"],
-        "social_media": ["post", "tweet", "social media", "instagram", "facebook", "linkedin"],
-        "report": ["report", "business report", "analysis report", "status", "findings"],
-        "comparison": ["compare", "comparison", "versus", "vs", "differences", "similarities"],
-        "research": ["research", "investigate", "study", "literature", "academic"],
-        "interview": ["interview", "job", "hiring", "position", "application"],
-        "sales_copy": ["sales", "copy", "product", "persuasive", "marketing"],
-        "api_documentation": ["api", "documentation", "endpoint", "interface", "reference"],
-        "syllabus": ["syllabus", "course", "lesson", "curriculum", "learning"]
-    }
+    best_match = _keyword_match(query, available_prompts)
     
-    for prompt_type, keywords in keyword_map.items():
-        prompt_name = f"{prompt_type}_prompt"
-        if prompt_name in available_prompts:
-            for keyword in keywords:
-                if keyword in query_lower:
-                    keyword_matches[prompt_name] = keyword_matches.get(prompt_name, 0) + 1
-    
-    # Find the prompt with the most keyword matches
-    if keyword_matches:
-        best_match = max(keyword_matches.items(), key=lambda x: x[1])
-        prompt_name = best_match[0]
+    if best_match:
+        prompt_name = best_match
         content_type = prompt_name.replace("_prompt", "")
         
         logger.info(f"✅ Matched query to '{prompt_name}' using fallback keyword matching")
@@ -489,11 +512,7 @@ async def enhance_query(state: QueryState) -> QueryState:
     original_parameters = parameters.copy()
     
     # Extract required variables from template FIRST
-    required_vars = []
-    template = prompt.template
-    for match in re.finditer(r'{{[ ]*([^{}]+)[ ]*}}', template):
-        var_name = match.group(1).strip()
-        required_vars.append(var_name)
+    required_vars = list(_template_vars(prompt.template))
     
     logger.info(f"Required variables: {required_vars}")
     
@@ -707,7 +726,7 @@ async def validate_query(state: QueryState) -> QueryState:
                             if json_match:
                                 json_str = json_match.group(1)
                                 # Try to parse the JSON
-                                json_data = json.loads(json_str)
+                                json_data = _json_loads(json_str)
                                 
                                 # Validate the parsed data has required fields
                                 if all(k in json_data for k in ["valid", "issues"]):
@@ -788,7 +807,7 @@ async def validate_query(state: QueryState) -> QueryState:
                 if raw_response:
                     try:
                         # Try to parse the whole response as JSON
-                        json_data = json.loads(raw_response)
+                        json_data = _json_loads(raw_response)
                         logger.debug(f"Successfully parsed raw response as JSON:\n{json.dumps(json_data, indent=2)}")
                     except json.JSONDecodeError:
                         # If that fails, try to extract a JSON object using regex
@@ -796,7 +815,7 @@ async def validate_query(state: QueryState) -> QueryState:
                         if json_match:
                             json_str = json_match.group(1)
                             try:
-                                json_data = json.loads(json_str)
+                                json_data = _json_loads(json_str)
                                 logger.debug(f"Extracted JSON from raw response:\n{json.dumps(json_data, indent=2)}")
                             except:
                                 logger.debug(f"Found JSON-like string but couldn't parse it:\n{json_str}")
@@ -807,7 +826,7 @@ async def validate_query(state: QueryState) -> QueryState:
                     if json_match:
                         json_str = json_match.group(1)
                         try:
-                            json_data = json.loads(json_str)
+                            json_data = _json_loads(json_str)
                             logger.debug(f"Extracted JSON from error:\n{json.dumps(json_data, indent=2)}")
                         except:
                             logger.debug(f"Found JSON-like string in error but couldn't parse it:\n{json_str}")
@@ -979,6 +998,9 @@ def route_based_on_validation(state: QueryState) -> str:
 # Create the complete workflow
 def create_workflow():
     """Create and return the LangGraph workflow."""
+    # LangGraph is imported here so loading the node functions stays cheap
+    from langgraph.graph import StateGraph, END, START
+    
     # Create the graph with type hints
     workflow = StateGraph(QueryState)
     
@@ -3,10 +3,11 @@ Parser for reading prompts from markdown files.
 
 This module handles loading and parsing prompt templates defined in markdown files.
 """
+import os
 import re
 import logging
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, List, Optional, Set, Union
 
 logger = logging.getLogger("core4ai.prompt_parser")
 
@@ -89,7 +90,7 @@ def parse_prompt_file(file_path: Path) -> Optional[Dict[str, Any]]:
         logger.error(f"Error parsing prompt file {file_path}: {e}")
         return None
 
-def find_prompt_files(directory: Path) -> List[Path]:
+def find_prompt_files(directory: Union[str, Path]) -> List[Path]:
     """
     Find all markdown prompt files in a directory.
     
@@ -99,12 +100,15 @@ def find_prompt_files(directory: Path) -> List[Path]:
     Returns:
         List of paths to prompt files
     """
-    if not directory.exists():
+    try:
+        # scandir reuses the directory entry's cached type info instead of
+        # stat-ing every match like Path.glob does
+        with os.scandir(directory) as entries:
+            return [Path(entry.path) for entry in entries
+                    if entry.name.endswith(".md") and entry.is_file()]
+    except FileNotFoundError:
         logger.warning(f"Prompt directory does not exist: {directory}")
         return []
-    
-    try:
-        return list(directory.glob("*.md"))
     except Exception as e:
         logger.error(f"Error finding prompt files: {e}")
         return []
@@ -9,7 +9,7 @@ import logging
 import re
 import mlflow
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Set
+from typing import Dict, Any, Optional, List, Set, Union
 
 # Import new modules
 from .prompt_parser import parse_prompt_file, find_prompt_files, load_prompts_from_directory
@@ -17,6 +17,15 @@ from .prompt_types import get_prompt_types, add_prompt_type, add_multiple_prompt
 
 logger = logging.getLogger("core4ai.prompt_registry")
 
+# Parse JSON with orjson when it is installed; both accept bytes or str
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+# Matches {{ variable }} placeholders in prompt templates
+_VAR_RE = re.compile(r'{{([^{}]+)}}')
+
 # Default location for sample prompts
 SAMPLE_PROMPTS_DIR = Path(__file__).parent.parent / "sample_prompts"
 
@@ -152,8 +161,8 @@ def register_from_file(file_path: str, set_as_production: bool = True) -> Dict[s
     setup_mlflow_connection()
     
     try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
+        with open(file_path, 'rb') as f:
+            data = _json_loads(f.read())
         
         if not isinstance(data, dict) or "prompts" not in data:
             raise ValueError("JSON file must contain a 'prompts' list")
@@ -484,7 +493,7 @@ def list_prompts() -> Dict[str, Any]:
                 
                 # Extract variables from template
                 variables = []
-                for match in re.finditer(r'{{([^{}]+)}}', latest_prompt.template):
+                for match in _VAR_RE.finditer(latest_prompt.template):
                     var_name = match.group(1).strip()
                     variables.append(var_name)
                 
@@ -566,7 +575,7 @@ def import_existing_prompts(prompt_names: List[str]) -> Dict[str, Any]:
                 
             # Extract variables from template for info
             variables = []
-            for match in re.finditer(r'{{([^{}]+)}}', prompt.template):
+            for match in _VAR_RE.finditer(prompt.template):
                 var_name = match.group(1).strip()
                 if var_name not in variables:
                     variables.append(var_name)
@@ -599,7 +608,7 @@ def import_existing_prompts(prompt_names: List[str]) -> Dict[str, Any]:
         "prompt_types": prompt_types
     }
 
-def create_prompt_template(prompt_name: str, output_dir: Optional[Path] = None) -> Dict[str, Any]:
+def create_prompt_template(prompt_name: str, output_dir: Optional[Union[str, Path]] = None) -> Dict[str, Any]:
     """
     Create a template prompt file for users to customize.
     
@@ -610,8 +619,7 @@ def create_prompt_template(prompt_name: str, output_dir: Optional[Path] = None)
     Returns:
         Dictionary with creation results
     """
-    if not output_dir:
-        output_dir = Path.cwd()
+    output_dir = Path(output_dir) if output_dir else Path.cwd()
     
     # Ensure directory exists
     if not output_dir.exists():
@@ -793,7 +801,7 @@ def get_prompt_details(name: str) -> Dict[str, Any]:
             
         # Extract variables from the template
         variables = []
-        for match in re.finditer(r'{{([^{}]+)}}', latest_template):
+        for match in _VAR_RE.finditer(latest_template):
             var_name = match.group(1).strip()
             variables.append(var_name)
             
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
+import asyncio
+import json
 import logging
-from typing import Dict, Type, Any, Optional
+from typing import Dict, List, Tuple, Type, Any, Optional
 from pydantic import BaseModel
 
 logger = logging.getLogger("core4ai.providers.base")
@@ -11,13 +13,20 @@ class AIProvider(ABC):
     # Registry for provider classes
     _providers: Dict[str, Type['AIProvider']] = {}
     
+    # Constructed providers keyed by serialized config, with the event loop
+    # they were created on (their pooled HTTP clients are bound to it)
+    _instances: Dict[str, Tuple[Any, 'AIProvider']] = {}
+    
     def __init_subclass__(cls, **kwargs):
         """Auto-register provider subclasses."""
         super().__init_subclass__(**kwargs)
-        # Register the provider using the class name
-        provider_type = cls.__name__.lower().replace('provider', '')
+        # Register the provider using the class name minus the "Provider" suffix
+        name = cls.__name__
+        provider_type = (name[:-len("Provider")] if name.endswith("Provider") else name).lower()
+        if AIProvider._providers.get(provider_type) is cls:
+            return
         AIProvider._providers[provider_type] = cls
-        logger.debug(f"Registered provider: {provider_type}")
+        logger.debug("Registered provider: %s", provider_type)
     
     @property
     @abstractmethod
@@ -35,9 +44,54 @@ class AIProvider(ABC):
         """Generate a response for the given prompt with optional system message and temperature."""
         pass
     
+    async def generate_batch(self, prompts: List[str], max_concurrency: int = 16, **kwargs) -> List[str]:
+        """Generate responses for several prompts concurrently.
+        
+        Args:
+            prompts: The prompts to send
+            max_concurrency: Maximum number of requests in flight at once
+            **kwargs: Passed through to generate_response
+            
+        Returns:
+            List of responses, in the same order as ``prompts``
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def run_one(prompt: str) -> str:
+            async with semaphore:
+                return await self.generate_response(prompt, **kwargs)
+        
+        return await asyncio.gather(*(run_one(prompt) for prompt in prompts))
+    
     @classmethod
     def create(cls, config: Dict[str, Any]) -> 'AIProvider':
-        """Factory method to create an AI provider based on configuration."""
+        """Factory method to create an AI provider based on configuration.
+        
+        Providers are cached per configuration, so repeated calls with the same
+        config on the same event loop reuse one instance (and its HTTP client).
+        """
+        key = json.dumps(config, sort_keys=True, default=str)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        
+        cached = cls._instances.get(key)
+        if cached is not None and cached[0] is loop:
+            return cached[1]
+        
+        provider = cls._build(config)
+        cls._instances[key] = (loop, provider)
+        return provider
+    
+    @classmethod
+    def clear_cache(cls):
+        """Drop all cached provider instances."""
+        cls._instances.clear()
+    
+    @classmethod
+    def _build(cls, config: Dict[str, Any]) -> 'AIProvider':
+        """Construct a new provider instance from configuration."""
         provider_type = config.get('type')
         
         if not provider_type:
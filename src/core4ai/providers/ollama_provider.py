@@ -27,23 +27,36 @@ class OllamaProvider(AIProvider):
         # Store kwargs for later use when creating specialized models
         self.kwargs = kwargs
         
-        # Build parameters dict with only non-None values
-        model_params = {
-            "base_url": self.uri,
-            "model": self.model_name,
-            "temperature": temperature
-        }
-        
-        # Only add optional parameters if they're not None
-        for param in ['max_tokens', 'timeout', 'max_retries']:
-            if param in kwargs and kwargs[param] is not None:
-                model_params[param] = kwargs[param]
+        # ChatOllama clients keyed by (temperature, format), built on first use
+        self._models = {}
         
         # Use langchain-ollama's dedicated ChatOllama class
-        self.model = ChatOllama(**model_params)
+        self.model = self._chat_model(temperature)
         
         logger.info(f"Ollama provider initialized with model {self.model_name} at {self.uri}")
     
+    def _chat_model(self, temperature: float, format: Optional[str] = None) -> ChatOllama:
+        """Get a ChatOllama client for these settings, reusing one built earlier."""
+        key = (temperature, format)
+        model = self._models.get(key)
+        if model is None:
+            # Build parameters dict with only non-None values
+            model_params = {
+                "base_url": self.uri,
+                "model": self.model_name,
+                "temperature": temperature
+            }
+            if format:
+                model_params["format"] = format
+            
+            # Add any additional parameters that were passed to the constructor
+            for param in ['max_tokens', 'timeout', 'max_retries']:
+                if param in self.kwargs and self.kwargs[param] is not None:
+                    model_params[param] = self.kwargs[param]
+            
+            model = self._models[key] = ChatOllama(**model_params)
+        return model
+    
     @property
     def langchain_model(self):
         """Get the underlying LangChain model."""
@@ -51,21 +64,8 @@ class OllamaProvider(AIProvider):
     
     def with_structured_output(self, output_schema: Type[BaseModel], method="function_calling"):
         """Get a version of the langchain model with structured output."""
-        # For Ollama, create a new instance with format="json" when using structured output
-        model_params = {
-            "base_url": self.uri,
-            "model": self.model_name,
-            "temperature": 0.1,  # Lower temperature for structured outputs
-            "format": "json"  # Ensure JSON format for structured outputs
-        }
-        
-        # Add any additional parameters that were passed to the constructor
-        for param in ['max_tokens', 'timeout', 'max_retries']:
-            if param in self.kwargs and self.kwargs[param] is not None:
-                model_params[param] = self.kwargs[param]
-                    
-        # Create a specialized model for structured output
-        structured_model = ChatOllama(**model_params)
+        # For Ollama, use an instance with format="json" and a lower temperature
+        structured_model = self._chat_model(0.1, format="json")
         
         # Always use parser method for Ollama models regardless of the method parameter
         return structured_model.with_structured_output(output_schema, method="parser")
@@ -75,20 +75,9 @@ class OllamaProvider(AIProvider):
         try:
             logger.debug(f"Sending prompt to Ollama: {prompt[:50]}...")
             
-            # If temperature is specified for this specific request, create a new model instance
+            # A per-request temperature gets its own (cached) model instance
             if temperature is not None and temperature != self.temperature:
-                model_params = {
-                    "base_url": self.uri,
-                    "model": self.model_name,
-                    "temperature": temperature
-                }
-                
-                # Add any additional parameters that were passed to the constructor
-                for param in ['max_tokens', 'timeout', 'max_retries']:
-                    if param in self.kwargs and self.kwargs[param] is not None:
-                        model_params[param] = self.kwargs[param]
-                
-                model = ChatOllama(**model_params)
+                model = self._chat_model(temperature)
             else:
                 model = self.model
             
@@ -4,21 +4,22 @@ Shared pytest fixtures for Core4AI tests.
 This file contains fixtures used across multiple test files.
 """
 import os
-import sys
-import json
-import pytest
-import tempfile
+import re
 import shutil
+import asyncio
+import pytest
 from pathlib import Path
+from types import MappingProxyType
 from unittest.mock import MagicMock, patch
 
-# Make sure core4ai package is importable
-sys.path.insert(0, str(Path(__file__).parent.parent))
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Import core4ai components
 from src.core4ai.config.config import save_config
 from src.core4ai.providers import AIProvider
-from src.core4ai.prompt_manager.registry import register_prompt
 
 # Define constants
 TEST_MLFLOW_URI = "http://localhost:8080"
@@ -26,42 +27,129 @@ TEST_OPENAI_KEY = "test-openai-key-for-testing-only"
 TEST_OLLAMA_URI = "http://localhost:11434"
 
 # Mock for MLflow
+class _KeepMissing(dict):
+    """format_map mapping that leaves unknown placeholders in place."""
+    
+    def __missing__(self, key):
+        return "{{ %s }}" % key
+
 class MockPrompt:
     """Mock for MLflow prompt objects."""
+    __slots__ = ("name", "template", "version", "tags", "_fmt")
+    
+    _PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+    
     def __init__(self, name, template, version=1, tags=None):
         self.name = name
         self.template = template
         self.version = version
         self.tags = tags or {}
+        
+        # Convert the template to a str.format string once: split() alternates
+        # literal text and placeholder names, and literal braces are escaped
+        parts = self._PLACEHOLDER_RE.split(template)
+        self._fmt = "".join(
+            "{%s}" % part if i % 2 else part.replace("{", "{{").replace("}", "}}")
+            for i, part in enumerate(parts)
+        )
     
     def format(self, **kwargs):
         """Format the prompt template with provided parameters."""
-        result = self.template
-        for key, value in kwargs.items():
-            placeholder = f"{{{{ {key} }}}}"
-            result = result.replace(placeholder, str(value))
-        return result
+        return self._fmt.format_map(_KeepMissing(kwargs))
+
+class FastAsyncStub:
+    """Lightweight stand-in for a provider whose generate_response is awaited.
+    
+    Returns the given responses in order and records each prompt in calls.
+    An exception instance in responses is raised instead of returned.
+    """
+    __slots__ = ("_it", "calls")
+    
+    def __init__(self, responses):
+        self._it = iter(responses)
+        self.calls = []
+    
+    async def generate_response(self, prompt, **kwargs):
+        """Return the next canned response."""
+        self.calls.append(prompt)
+        response = next(self._it)
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_asyncio_loop_factories(config, item):
+    """Run async tests on uvloop when it is installed (it is unavailable on Windows)."""
+    if uvloop is not None:
+        return {"uvloop": uvloop.new_event_loop}
+    return {"asyncio": asyncio.new_event_loop}
+
+def pytest_configure(config):
+    """Fail loudly if the installed pytest-asyncio would skip the uvloop hook above.
+    
+    The hook is optional, so pytest-asyncio < 1.4 (which has no spec for it)
+    silently runs every test on the default loop instead.
+    """
+    if uvloop is None:
+        return
+    if config.pluginmanager.hook.pytest_asyncio_loop_factories.spec is None:
+        raise pytest.UsageError(
+            "uvloop is installed but pytest-asyncio does not support "
+            "pytest_asyncio_loop_factories; install pytest-asyncio>=1.4.0"
+        )
+
+@pytest.fixture(autouse=True)
+def clear_provider_cache():
+    """Keep cached provider instances from leaking between tests."""
+    AIProvider.clear_cache()
+    yield
+    AIProvider.clear_cache()
 
 # Fixtures for configuration
+def _redirect_config_dir(mp, config_dir):
+    """Point the config modules at config_dir using the given MonkeyPatch.
+    
+    The module paths are redirected too, so tests never touch ~/.core4ai
+    and parallel (xdist) workers don't share files.
+    """
+    from src.core4ai.config import config
+    from src.core4ai.prompt_manager import prompt_types
+    
+    mp.setenv("CORE4AI_CONFIG_DIR", str(config_dir))
+    mp.setattr(config, "CONFIG_DIR", config_dir)
+    mp.setattr(config, "CONFIG_FILE", config_dir / "config.yaml")
+    mp.setattr(prompt_types, "CONFIG_DIR", config_dir)
+    mp.setattr(prompt_types, "PROMPT_TYPES_FILE", config_dir / "prompt_types.json")
+    config.clear_config_cache()
+
+def _new_config_dir(tmp_path_factory):
+    """Create a fresh, empty config directory under pytest's temp root."""
+    return tmp_path_factory.mktemp("core4ai_config")
+
 @pytest.fixture
-def temp_config_dir():
-    """Create a temporary directory for configuration files."""
-    temp_dir = tempfile.mkdtemp()
-    old_env = dict(os.environ)
+def temp_config_dir(monkeypatch, tmp_path_factory):
+    """Provide an empty temporary configuration directory for one test."""
+    from src.core4ai.config import config
+    
+    config_dir = _new_config_dir(tmp_path_factory)
     
-    # Set environment variable to use temp config dir
-    os.environ["CORE4AI_CONFIG_DIR"] = temp_dir
+    # monkeypatch undoes the redirection after the test
+    _redirect_config_dir(monkeypatch, config_dir)
     
-    yield temp_dir
+    yield str(config_dir)
     
-    # Cleanup
-    os.environ.clear()
-    os.environ.update(old_env)
-    shutil.rmtree(temp_dir)
+    config.clear_config_cache()
 
-@pytest.fixture
-def config_file(temp_config_dir):
-    """Create a sample configuration file."""
+def _dir_state(path):
+    """Map each entry in path to its modification time, to detect writes."""
+    return {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(path)}
+
+@pytest.fixture(scope="session")
+def _sample_config_dir(tmp_path_factory):
+    """Directory holding the sample config.yaml, written once per session.
+    
+    Read-only: tests that write configuration or prompt types use temp_config_dir.
+    """
     config = {
         "mlflow_uri": TEST_MLFLOW_URI,
         "provider": {
@@ -71,9 +159,41 @@ def config_file(temp_config_dir):
         }
     }
     
-    config_path = Path(temp_config_dir) / "config.yaml"
-    save_config(config)
+    config_dir = _new_config_dir(tmp_path_factory)
+    with pytest.MonkeyPatch.context() as mp:
+        _redirect_config_dir(mp, config_dir)
+        save_config(config)
+    return config_dir
+
+@pytest.fixture
+def config_file(monkeypatch, _sample_config_dir):
+    """Point the config modules at the sample configuration for one test.
+    
+    Tests that need to change the configuration should use temp_config_dir
+    instead and save their own config.
+    """
+    from src.core4ai.config import config
+    
+    # monkeypatch undoes the redirection after the test
+    _redirect_config_dir(monkeypatch, _sample_config_dir)
+    before = _dir_state(_sample_config_dir)
+    
+    yield _sample_config_dir / "config.yaml"
     
+    config.clear_config_cache()
+    assert _dir_state(_sample_config_dir) == before, (
+        "Test wrote to the shared sample config directory; use temp_config_file"
+    )
+
+@pytest.fixture
+def temp_config_file(temp_config_dir, _sample_config_dir):
+    """Copy the sample configuration into this test's own config directory.
+    
+    For tests that need the sample config and also write to the config
+    directory (e.g. registering prompts records their prompt types).
+    """
+    config_path = Path(temp_config_dir) / "config.yaml"
+    shutil.copyfile(_sample_config_dir / "config.yaml", config_path)
     return config_path
 
 @pytest.fixture
@@ -108,68 +228,155 @@ def mock_ollama_provider():
         provider.generate_response.side_effect = lambda prompt: f"Mock response for: {prompt[:30]}..."
         yield provider
 
+@pytest.fixture
+def install_provider(monkeypatch):
+    """Return a function that makes AIProvider.create return a given provider.
+    
+    The patch is undone after the test; the function returns its argument.
+    """
+    def install(provider):
+        monkeypatch.setattr(AIProvider, "create", lambda *args, **kwargs: provider)
+        return provider
+    return install
+
+@pytest.fixture
+def patched_provider(install_provider):
+    """Make AIProvider.create return a FastAsyncStub for this test.
+    
+    Set the replies with ``patched_provider._it = iter([...])``.
+    """
+    return install_provider(FastAsyncStub([]))
+
+def make_provider(output):
+    """Build a stub provider whose structured model always returns output.
+    
+    The workflow nodes pipe their prompt template into the structured model,
+    so it is a Runnable rather than a plain stub. The provider is a MagicMock
+    so tests can assert on its with_structured_output calls.
+    """
+    from langchain_core.runnables import RunnableLambda
+    
+    provider = MagicMock()
+    provider.with_structured_output.return_value = RunnableLambda(lambda messages: output)
+    return provider
+
+@pytest.fixture
+def provider_factory():
+    """Build structured-output stub providers with make_provider."""
+    return make_provider
+
+@pytest.fixture(scope="session")
+def workflow():
+    """Build and compile the LangGraph workflow once for the session."""
+    from src.core4ai.engine.workflow import create_workflow
+    return create_workflow()
+
 # Fixtures for mock MLflow
+_PROMPT_URI_RE = re.compile(r"prompts:/([^@/]+)")
+
+# Prompts every mock_mlflow test starts with, built once at import.
+# Read-only: tests get their own dict copy to add to or clear.
+_DEFAULT_PROMPTS = MappingProxyType({
+    "essay_prompt": MockPrompt(
+        "essay_prompt", 
+        "Write a well-structured essay on {{ topic }} that includes an introduction, body, and conclusion.",
+        version=1,
+        tags={"type": "essay", "task": "writing"}
+    ),
+    "email_prompt": MockPrompt(
+        "email_prompt",
+        "Write a {{ formality }} email to my {{ recipient_type }} about {{ topic }}.",
+        version=1,
+        tags={"type": "email", "task": "writing"}
+    ),
+    "comparison_prompt": MockPrompt(
+        "comparison_prompt",
+        "Compare {{ item_1 }} and {{ item_2 }} in terms of {{ aspects }}.",
+        version=1,
+        tags={"type": "comparison", "task": "analysis"}
+    )
+})
+
+@pytest.fixture(scope="session")
+def _mlflow_mock():
+    """MagicMock standing in for the mlflow module, built once per session.
+    
+    Tests only see it through mock_mlflow, which resets it for each test.
+    """
+    return MagicMock()
+
 @pytest.fixture
-def mock_mlflow():
+def mock_mlflow(monkeypatch, _mlflow_mock):
     """Mock MLflow interactions."""
-    with patch('src.core4ai.prompt_manager.registry.mlflow') as mock_mlflow:
-        # Setup load_prompt mock
-        mock_prompts = {
-            "essay_prompt": MockPrompt(
-                "essay_prompt", 
-                "Write a well-structured essay on {{ topic }} that includes an introduction, body, and conclusion.",
-                version=1,
-                tags={"type": "essay", "task": "writing"}
-            ),
-            "email_prompt": MockPrompt(
-                "email_prompt",
-                "Write a {{ formality }} email to my {{ recipient_type }} about {{ topic }}.",
-                version=1,
-                tags={"type": "email", "task": "writing"}
-            ),
-            "comparison_prompt": MockPrompt(
-                "comparison_prompt",
-                "Compare {{ item_1 }} and {{ item_2 }} in terms of {{ aspects }}.",
-                version=1,
-                tags={"type": "comparison", "task": "analysis"}
-            )
-        }
+    from src.core4ai.prompt_manager import registry
+    
+    # Patched for this test only, so tests that don't ask for it see the real module
+    mock_mlflow = _mlflow_mock
+    monkeypatch.setattr(registry, "mlflow", mock_mlflow)
+    
+    # Forget calls and any side effects or return values set by the previous test
+    mock_mlflow.reset_mock(return_value=True, side_effect=True)
+    
+    # Setup load_prompt mock
+    mock_prompts = dict(_DEFAULT_PROMPTS)
+    
+    def mock_load_prompt(prompt_name):
+        """Mock function to load prompts."""
+        # Extract name from "prompts:/name", "prompts:/name@alias" or "prompts:/name/version"
+        m = _PROMPT_URI_RE.match(prompt_name)
+        name = m.group(1) if m else prompt_name
         
-        def mock_load_prompt(prompt_name):
-            """Mock function to load prompts."""
-            if "@" in prompt_name:
-                name = prompt_name.split("/")[1].split("@")[0]  # Extract name from "prompts:/name@alias"
-            else:
-                name = prompt_name.split("/")[1]  # Extract name from "prompts:/name"
-                
-            if name in mock_prompts:
-                return mock_prompts[name]
+        prompt = mock_prompts.get(name)
+        if prompt is None:
             raise ValueError(f"Prompt {name} not found")
-        
-        mock_mlflow.load_prompt.side_effect = mock_load_prompt
-        
-        # Setup register_prompt mock
-        def mock_register_prompt(name, template, commit_message="", tags=None, version_metadata=None):
-            """Mock function to register prompts."""
-            mock_prompts[name] = MockPrompt(
-                name, 
-                template, 
-                version=len(mock_prompts) + 1,
-                tags=tags or {}
-            )
-            return mock_prompts[name]
-        
-        mock_mlflow.register_prompt.side_effect = mock_register_prompt
-        
-        yield mock_mlflow, mock_prompts
+        return prompt
+    
+    mock_mlflow.load_prompt.side_effect = mock_load_prompt
+    
+    # Setup register_prompt mock
+    def mock_register_prompt(name, template, commit_message="", tags=None, version_metadata=None):
+        """Mock function to register prompts."""
+        mock_prompts[name] = MockPrompt(
+            name, 
+            template, 
+            version=len(mock_prompts) + 1,
+            tags=tags or {}
+        )
+        return mock_prompts[name]
+    
+    mock_mlflow.register_prompt.side_effect = mock_register_prompt
+    
+    return mock_mlflow, mock_prompts
+
+def assert_clean(result):
+    """Assert a CliRunner result exited 0, showing output and exception if not."""
+    assert result.exit_code == 0, (
+        f"exit={result.exit_code} exc={result.exception!r}\n{result.output}"
+    )
 
 # CLI testing fixtures
-@pytest.fixture
+@pytest.fixture(scope="session")
 def cli_runner():
-    """Create a CLI runner for testing commands."""
+    """Create a CLI runner shared by all command tests.
+    
+    CliRunner keeps no state between invoke() calls, so one instance is enough.
+    Click 8.2+ always captures stderr separately, so no mix_stderr flag is needed.
+    """
     from click.testing import CliRunner
-    runner = CliRunner()
-    return runner
+    return CliRunner()
+
+# Canned process_query result, built once and shallow-copied per call
+_MOCK_RESULT = {
+    "original_query": "test query",
+    "prompt_match": {"status": "matched", "prompt_name": "test_prompt", "confidence": 90},
+    "content_type": "essay",
+    "enhanced": True,
+    "initial_enhanced_query": "Enhanced test query",
+    "enhanced_query": "Adjusted test query",
+    "validation_result": "VALID",
+    "validation_issues": [],
+    "response": "This is a mock response to the query."
+}
 
 @pytest.fixture
 def mock_process_query():
@@ -177,17 +384,7 @@ def mock_process_query():
     # The correct import path must match the one used in cli/commands.py
     with patch('src.core4ai.engine.processor.process_query', autospec=True) as mock:
         async def mock_process(*args, **kwargs):
-            return {
-                "original_query": "test query",
-                "prompt_match": {"status": "matched", "prompt_name": "test_prompt", "confidence": 90},
-                "content_type": "essay",
-                "enhanced": True,
-                "initial_enhanced_query": "Enhanced test query",
-                "enhanced_query": "Adjusted test query",
-                "validation_result": "VALID",
-                "validation_issues": [],
-                "response": "This is a mock response to the query."
-            }
+            return _MOCK_RESULT.copy()
         
         mock.side_effect = mock_process
         yield mock
\ No newline at end of file
@@ -20,26 +20,31 @@ class TestConfig:
             assert config.get_mlflow_uri() is None
             assert config.get_provider_config()["type"] is None
     
-    def test_config_with_values(self):
+    @pytest.mark.parametrize("provider, expected", [
+        (
+            {"type": "openai", "api_key": "test-key", "model": "test-model"},
+            {"type": "openai", "api_key": "test-key", "model": "test-model"}
+        ),
+        (
+            {"type": "ollama", "uri": "http://test-ollama:11434", "model": "test-model"},
+            {"type": "ollama", "uri": "http://test-ollama:11434", "model": "test-model"}
+        ),
+    ], ids=["openai", "ollama"])
+    def test_config_with_values(self, provider, expected):
         """Test with mock config values."""
         test_config = {
             "mlflow_uri": "http://test-mlflow:5000",
-            "provider": {
-                "type": "openai",
-                "api_key": "test-key",
-                "model": "test-model"
-            }
+            "provider": provider
         }
         
         # Mock load_config to return our test values
-        with patch('src.core4ai.config.config.load_config', return_value=test_config):
+        with patch('src.core4ai.config.config.load_config', return_value=test_config), \
+             patch.dict('os.environ', clear=True):
             # Test getting values from the mocked config
             uri = config.get_mlflow_uri()
             assert uri == "http://test-mlflow:5000"
             
-            provider_config = config.get_provider_config()
-            assert provider_config["type"] == "openai"
-            assert provider_config["model"] == "test-model"
+            assert config.get_provider_config() == expected
     
     def test_env_variables(self):
         """Test environment variables override config."""
@@ -65,4 +70,47 @@ class TestConfig:
                 # Test that env var takes precedence for API key
                 provider_config = config.get_provider_config()
                 assert provider_config["api_key"] == "env-key"
-                assert provider_config["model"] == "test-model"
\ No newline at end of file
+                assert provider_config["model"] == "test-model"
+    
+    def test_load_config_cached(self, tmp_path):
+        """Test the config file is parsed once and refreshed on save."""
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text("mlflow_uri: http://cached:5000\n")
+        
+        with patch.object(config, 'CONFIG_DIR', tmp_path), \
+             patch.object(config, 'CONFIG_FILE', config_file):
+            config.clear_config_cache()
+            try:
+                with patch('src.core4ai.config.config.yaml.load',
+                           wraps=config.yaml.load) as mock_load:
+                    first = config.load_config()
+                    first["mlflow_uri"] = "mutated"
+                    assert config.load_config()["mlflow_uri"] == "http://cached:5000"
+                    assert mock_load.call_count == 1
+                
+                config.save_config({"mlflow_uri": "http://saved:5000"})
+                assert config.load_config()["mlflow_uri"] == "http://saved:5000"
+            finally:
+                config.clear_config_cache()
+    
+    def test_load_config_reloads_changed_file(self, tmp_path):
+        """Test edits made outside save_config are picked up."""
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text("mlflow_uri: http://before:5000\n")
+        
+        with patch.object(config, 'CONFIG_DIR', tmp_path), \
+             patch.object(config, 'CONFIG_FILE', config_file):
+            config.clear_config_cache()
+            try:
+                assert config.load_config()["mlflow_uri"] == "http://before:5000"
+                
+                config_file.write_text("mlflow_uri: http://after:5000\n")
+                # Force a new mtime in case the filesystem clock is coarse
+                stat = config_file.stat()
+                os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+                assert config.load_config()["mlflow_uri"] == "http://after:5000"
+                
+                config_file.unlink()
+                assert config.load_config() == {}
+            finally:
+                config.clear_config_cache()
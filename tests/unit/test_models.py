@@ -0,0 +1,32 @@
+"""
+Unit tests for the engine's structured output models.
+"""
+import pytest
+from pydantic import ValidationError
+
+from src.core4ai.engine.models import PromptMatch
+
+def _match(confidence):
+    """Build a PromptMatch with the given confidence."""
+    return PromptMatch(prompt_name="none", confidence=confidence, reasoning="test", parameters={})
+
+class TestPromptMatch:
+    """Test PromptMatch confidence normalization."""
+    
+    @pytest.mark.parametrize("confidence, expected", [
+        # The match prompts ask for 0 when no template fits
+        (0, 0),
+        (0.5, 50),
+        (1, 1),
+        (85, 85),
+        (100, 100),
+    ], ids=["zero", "fraction", "one", "percent", "hundred"])
+    def test_confidence_accepted(self, confidence, expected):
+        """Test confidence values that are kept or scaled to 0-100."""
+        assert _match(confidence).confidence == expected
+    
+    @pytest.mark.parametrize("confidence", [-0.5, -1, 100.5, 150], ids=["neg_fraction", "negative", "just_over", "over"])
+    def test_confidence_rejected(self, confidence):
+        """Test confidence values outside 0-100 are rejected."""
+        with pytest.raises(ValidationError):
+            _match(confidence)
@@ -5,7 +5,8 @@ import pytest
 import os
 import json
 from pathlib import Path
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, mock_open
+from tests.conftest import MockPrompt
 
 from src.core4ai.prompt_manager.registry import (
     register_prompt,
@@ -16,10 +17,44 @@ from src.core4ai.prompt_manager.registry import (
     get_prompt_details
 )
 
+# Contents of the prompts file served by mock_open, serialized once at import.
+# Bytes, since register_from_file opens the file in binary mode.
+PROMPTS_FILE_JSON = json.dumps({
+    "prompts": [
+        {
+            "name": "file_prompt_1",
+            "template": "Template 1 with {{ var1 }}",
+            "commit_message": "From file 1",
+            "tags": {"type": "file", "task": "test1"}
+        },
+        {
+            "name": "file_prompt_2",
+            "template": "Template 2 with {{ var2 }}",
+            "commit_message": "From file 2",
+            "tags": {"type": "file", "task": "test2"}
+        }
+    ]
+}).encode()
+
+@pytest.fixture
+def registered_prompts(mock_mlflow):
+    """Seed the mock registry with prompts, skipping the register_prompt round-trip."""
+    mock_mlflow_obj, mock_prompts = mock_mlflow
+    prompts = {
+        "update_test": MockPrompt("update_test", "Original {{ template }}"),
+        "detail_test": MockPrompt(
+            "detail_test",
+            "Template with {{ var1 }} and {{ var2 }}",
+            tags={"type": "detail", "task": "testing"}
+        )
+    }
+    mock_prompts.update(prompts)
+    return prompts
+
 class TestPromptRegistry:
     """Test the prompt registry functionality."""
     
-    def test_register_prompt(self, mock_mlflow, temp_config_dir):
+    def test_register_prompt(self, mock_mlflow, temp_config_file):
         """Test registering a new prompt."""
         mock_mlflow_obj, mock_prompts = mock_mlflow
         
@@ -43,7 +78,7 @@ class TestPromptRegistry:
         assert call_args["template"] == "This is a {{ test }} template"
         assert call_args["tags"] == {"type": "test", "task": "testing"}
     
-    def test_register_prompt_error(self, mock_mlflow, temp_config_dir):
+    def test_register_prompt_error(self, mock_mlflow, temp_config_file):
         """Test error handling when registering a prompt."""
         mock_mlflow_obj, mock_prompts = mock_mlflow
         
@@ -62,32 +97,16 @@ class TestPromptRegistry:
         assert "error" in result
         assert result["name"] == "error_prompt"
     
-    def test_register_from_file(self, mock_mlflow, temp_config_dir, tmp_path):
+    def test_register_from_file(self, mock_mlflow, temp_config_file):
         """Test registering prompts from a file."""
         mock_mlflow_obj, mock_prompts = mock_mlflow
         
-        # Create a temporary prompts file
-        prompts_file = tmp_path / "test_prompts.json"
-        with open(prompts_file, 'w') as f:
-            json.dump({
-                "prompts": [
-                    {
-                        "name": "file_prompt_1",
-                        "template": "Template 1 with {{ var1 }}",
-                        "commit_message": "From file 1",
-                        "tags": {"type": "file", "task": "test1"}
-                    },
-                    {
-                        "name": "file_prompt_2",
-                        "template": "Template 2 with {{ var2 }}",
-                        "commit_message": "From file 2",
-                        "tags": {"type": "file", "task": "test2"}
-                    }
-                ]
-            }, f)
-        
-        # Register from file
-        result = register_from_file(str(prompts_file))
+        # Register from a file served from memory
+        with patch('src.core4ai.prompt_manager.registry.open',
+                   mock_open(read_data=PROMPTS_FILE_JSON), create=True) as mock_file:
+            result = register_from_file("test_prompts.json")
+        
+        mock_file.assert_called_once_with("test_prompts.json", 'rb')
         
         # Verify result
         assert result["status"] == "success"
@@ -97,23 +116,20 @@ class TestPromptRegistry:
         # Verify mock was called correctly
         assert mock_mlflow_obj.register_prompt.call_count == 2
     
-    def test_register_from_file_error(self, mock_mlflow, temp_config_dir, tmp_path):
+    def test_register_from_file_error(self, mock_mlflow, temp_config_file):
         """Test error handling with invalid prompt file."""
         mock_mlflow_obj, mock_prompts = mock_mlflow
         
-        # Create an invalid file (not JSON)
-        invalid_file = tmp_path / "invalid.json"
-        with open(invalid_file, 'w') as f:
-            f.write("Not valid JSON")
-        
-        # Try to register from invalid file
-        result = register_from_file(str(invalid_file))
+        # Try to register from an invalid file (not JSON)
+        with patch('src.core4ai.prompt_manager.registry.open',
+                   mock_open(read_data=b"Not valid JSON"), create=True):
+            result = register_from_file("invalid.json")
         
         # Verify error result
         assert result["status"] == "error"
         assert "error" in result
     
-    def test_list_prompts(self, mock_mlflow, temp_config_dir):
+    def test_list_prompts(self, mock_mlflow, config_file):
         """Test listing all prompts."""
         mock_mlflow_obj, mock_prompts = mock_mlflow
         
@@ -129,18 +145,9 @@ class TestPromptRegistry:
         assert "count" in result
         assert isinstance(result["prompts"], list)
     
-    def test_update_prompt(self, mock_mlflow, temp_config_dir):
+    def test_update_prompt(self, registered_prompts, config_file):
         """Test updating an existing prompt."""
-        mock_mlflow_obj, mock_prompts = mock_mlflow
-        
-        # First register a prompt
-        register_prompt(
-            name="update_test",
-            template="Original {{ template }}",
-            commit_message="Original"
-        )
-        
-        # Now update it
+        # Update the seeded prompt
         result = update_prompt(
             name="update_test",
             template="Updated {{ template }}",
@@ -153,19 +160,9 @@ class TestPromptRegistry:
         assert "previous_version" in result
         assert "new_version" in result
     
-    def test_get_prompt_details(self, mock_mlflow, temp_config_dir):
+    def test_get_prompt_details(self, registered_prompts, config_file):
         """Test getting detailed information about a prompt."""
-        mock_mlflow_obj, mock_prompts = mock_mlflow
-        
-        # Register a test prompt first
-        register_prompt(
-            name="detail_test",
-            template="Template with {{ var1 }} and {{ var2 }}",
-            commit_message="For details test",
-            tags={"type": "detail", "task": "testing"}
-        )
-        
-        # Get details
+        # Get details for the seeded prompt
         result = get_prompt_details("detail_test")
         
         # Verify result
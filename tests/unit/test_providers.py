@@ -3,8 +3,9 @@ Unit tests for the provider modules.
 """
 import pytest
 import json
+import asyncio
+from types import SimpleNamespace
 from unittest.mock import patch, AsyncMock, MagicMock
-import aiohttp
 
 from src.core4ai.providers import AIProvider
 from src.core4ai.providers.openai_provider import OpenAIProvider
@@ -12,26 +13,56 @@ from src.core4ai.providers.ollama_provider import OllamaProvider
 from langchain_ollama import ChatOllama  
 from langchain_openai import ChatOpenAI 
 
+def _stub_chat_model(mock_chat, content=None, error=None):
+    """Make a patched LangChain chat class return a model whose ainvoke
+    replies with content, or raises error if one is given."""
+    mock_instance = mock_chat.return_value
+    if error is not None:
+        mock_instance.ainvoke = AsyncMock(side_effect=error)
+    else:
+        mock_instance.ainvoke = AsyncMock(return_value=SimpleNamespace(content=content))
+    return mock_instance
+
 class TestProviders:
     """Test the AI provider functionality."""
     
-    def test_provider_factory(self):
+    @pytest.mark.parametrize("config, cls_path, call_kwargs", [
+        (
+            {"type": "openai", "api_key": "test-key"},
+            'src.core4ai.providers.openai_provider.OpenAIProvider',
+            # Include temperature in the expected call
+            {"api_key": "test-key", "model": "gpt-3.5-turbo", "temperature": 0.7}
+        ),
+        (
+            {"type": "ollama", "uri": "http://test-uri", "model": "test-model"},
+            'src.core4ai.providers.ollama_provider.OllamaProvider',
+            {"uri": "http://test-uri", "model": "test-model", "temperature": 0.7}
+        ),
+    ], ids=["openai", "ollama"])
+    def test_provider_factory(self, config, cls_path, call_kwargs):
         """Test creating providers using the factory method."""
-        # Test creating OpenAI provider
+        with patch(cls_path) as mock_cls:
+            provider = AIProvider.create(config)
+            assert provider == mock_cls.return_value
+            mock_cls.assert_called_once_with(**call_kwargs)
+    
+    def test_provider_factory_caches_instances(self):
+        """Test the factory reuses providers for an identical config."""
         with patch('src.core4ai.providers.openai_provider.OpenAIProvider') as mock_openai:
-            provider = AIProvider.create({"type": "openai", "api_key": "test-key"})
-            assert provider == mock_openai.return_value
-            # Include temperature in the expected call
-            mock_openai.assert_called_once_with(api_key="test-key", model="gpt-3.5-turbo", temperature=0.7)
-    @pytest.mark.asyncio
+            mock_openai.side_effect = lambda **kwargs: MagicMock()
+            first = AIProvider.create({"type": "openai", "api_key": "test-key"})
+            second = AIProvider.create({"api_key": "test-key", "type": "openai"})
+            other = AIProvider.create({"type": "openai", "api_key": "other-key"})
+            
+            assert first is second
+            assert other is not first
+            assert mock_openai.call_count == 2
+    
     async def test_openai_provider(self):
         """Test OpenAI provider functionality."""
         # Mock the ChatOpenAI class
         with patch('src.core4ai.providers.openai_provider.ChatOpenAI') as mock_chat:
-            # Setup the mock
-            mock_instance = mock_chat.return_value
-            mock_instance.ainvoke = AsyncMock()
-            mock_instance.ainvoke.return_value.content = "OpenAI response"
+            _stub_chat_model(mock_chat, content="OpenAI response")
             
             # Create provider and test
             provider = OpenAIProvider(api_key="test-key", model="gpt-3.5-turbo")
@@ -42,15 +73,11 @@ class TestProviders:
             # Include temperature in the expected call
             mock_chat.assert_called_once_with(api_key="test-key", model="gpt-3.5-turbo", temperature=0.7)
     
-    @pytest.mark.asyncio
     async def test_ollama_provider(self):
         """Test Ollama provider functionality."""
         # Mock the ChatOllama class
         with patch('src.core4ai.providers.ollama_provider.ChatOllama') as mock_chat:
-            # Setup the mock
-            mock_instance = mock_chat.return_value
-            mock_instance.ainvoke = AsyncMock()
-            mock_instance.ainvoke.return_value.content = "Ollama response"
+            _stub_chat_model(mock_chat, content="Ollama response")
             
             # Create provider and test
             provider = OllamaProvider(uri="http://test-uri", model="test-model")
@@ -61,34 +88,62 @@ class TestProviders:
             # Include temperature in the expected call
             mock_chat.assert_called_once_with(base_url="http://test-uri", model="test-model", temperature=0.7)
 
-    @pytest.mark.asyncio
-    async def test_openai_provider_error(self):
-        """Test OpenAI provider error handling."""
-        # Mock the ChatOpenAI class to raise exception
-        with patch('src.core4ai.providers.openai_provider.ChatOpenAI') as mock_chat:
-            # Setup the mock to raise
-            mock_instance = mock_chat.return_value
-            mock_instance.ainvoke = AsyncMock(side_effect=Exception("API error"))
-            
-            # Create provider and test
-            provider = OpenAIProvider(api_key="test-key")
+    def test_ollama_provider_reuses_models(self):
+        """Test Ollama builds each ChatOllama configuration only once."""
+        with patch('src.core4ai.providers.ollama_provider.ChatOllama') as mock_chat:
+            provider = OllamaProvider(uri="http://test-uri", model="test-model")
+            provider.with_structured_output(MagicMock())
+            provider.with_structured_output(MagicMock())
             
-            # Now we expect the exception to be raised
-            with pytest.raises(Exception, match="API error"):
-                await provider.generate_response("Test prompt")
-    
-    @pytest.mark.asyncio
-    async def test_openai_provider_error(self):
+            # One default model plus one JSON-format model for structured output
+            assert mock_chat.call_count == 2
+            mock_chat.assert_called_with(base_url="http://test-uri", model="test-model", temperature=0.1, format="json")
+
+    @pytest.mark.parametrize("error", [Exception("API error"), TimeoutError("timed out")],
+                             ids=["api_error", "timeout"])
+    async def test_openai_provider_error(self, error):
         """Test OpenAI provider error handling."""
         # Mock the ChatOpenAI class to raise exception
         with patch('src.core4ai.providers.openai_provider.ChatOpenAI') as mock_chat:
-            # Setup the mock to raise
-            mock_instance = mock_chat.return_value
-            mock_instance.ainvoke = AsyncMock(side_effect=Exception("API error"))
+            _stub_chat_model(mock_chat, error=error)
             
             # Create provider and test
             provider = OpenAIProvider("test-key")
             response = await provider.generate_response("Test prompt")
             
             # Should return error message
-            assert "Error generating response" in response
\ No newline at end of file
+            assert "Error generating response" in response
+            assert str(error) in response
+    
+    async def test_generate_batch(self, monkeypatch):
+        """Test generate_batch keeps order and caps concurrent requests."""
+        # Defining the subclass registers it; keep that out of the shared registry
+        monkeypatch.setattr(AIProvider, "_providers", dict(AIProvider._providers))
+        
+        class SlowProvider(AIProvider):
+            def __init__(self):
+                self.in_flight = 0
+                self.peak = 0
+            
+            @property
+            def langchain_model(self):
+                return None
+            
+            def with_structured_output(self, output_schema, method="function_calling"):
+                return None
+            
+            async def generate_response(self, prompt, system_message=None, temperature=None):
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+                await asyncio.sleep(0.001)
+                self.in_flight -= 1
+                return f"Response to {prompt}"
+        
+        assert AIProvider._providers["slow"] is SlowProvider
+        
+        provider = SlowProvider()
+        prompts = [f"prompt {i}" for i in range(10)]
+        responses = await provider.generate_batch(prompts, max_concurrency=3)
+        
+        assert responses == [f"Response to {prompt}" for prompt in prompts]
+        assert provider.peak == 3